@@ -78,15 +78,22 @@ requests.request('POST', 'https://example.com', headers={}, data=b"'foo'")
 """
 
 import argparse
+import functools
 import json
-import pprint
 import re
 import sys
 
-from collections import namedtuple
-from typing import Callable, Dict, Optional, Tuple
+from typing import (Any, Callable, Dict, Iterator, List, NamedTuple, Optional,
+                    Tuple, TYPE_CHECKING)
 
-import requests
+if TYPE_CHECKING:
+    import requests     # imported lazily (slow) by perform_request()
+
+try:
+    import orjson   # type: ignore[import-not-found,unused-ignore]
+    json_loads: Callable[[str], Any] = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 __version__ = "0.2.0"
 NAME = "convert-to-requests"
@@ -96,35 +103,105 @@ to fetch") from stdin and either execute the request using requests.request()
 (exec subcommand) or print Python code to do so (code subcommand).
 """[1:-1]
 
-METHODS = ("GET", "OPTIONS", "HEAD", "POST", "PUT", "PATCH", "DELETE")
+METHODS = frozenset(("GET", "OPTIONS", "HEAD", "POST", "PUT", "PATCH", "DELETE"))
 
 ESC = {
     "a": "\a", "b": "\b", "e": "\027", "E": "\027", "f": "\f", "n": "\n",
     "r": "\r", "t": "\t", "v": "\v", "\\": "\\", "'": "'", '"': '"', "?": "?"
 }
-OCT = "01234567"
-HEX = "0123456789abcdef"
+OCT = frozenset("01234567")
+HEX = {c: int(c, 16) for c in "0123456789abcdefABCDEF"}
+HEX_DIGITS = {"x": 2, "u": 4, "U": 8}   # max. number of digits
+
+FETCH_HEAD = re.compile(r"^(await )?fetch\(")
+FETCH_TAIL = re.compile(r"\);$")
 
+BARE_TOKEN = re.compile(r"\S+")
+DOLLAR_SPECIAL = re.compile(r"[\\']")
+SIMPLE_TOKEN = re.compile(r"'([^']*)'|([^\s'\"\\#$]+)")
+SIMPLE_CURL = re.compile(r"(?:'[^']*'|[^\s'\"\\#$]+)(?:\s+(?:\\\n\s*)*(?:'[^']*'|[^\s'\"\\#$]+))*")
+STR_PARTS = re.compile(r"\S*\s*")
 
-class RequestData(namedtuple("_RequestData", ("method", "url", "headers", "data", "ignored"))):
+
+class RequestData(NamedTuple):
     """Request data (method, url, headers, data, ignored opts/args)."""
 
-    def exec(self, raise_for_status: bool = True) -> requests.Response:
+    method: str
+    url: str
+    headers: Dict[str, str]
+    data: Optional[bytes]
+    ignored: List[str]
+
+    def exec(self, raise_for_status: bool = True, *,
+             stream: bool = False) -> "requests.Response":
         """Execute request using perform_request()."""
-        return perform_request(*self[:-1], raise_for_status=raise_for_status)
+        return perform_request(*self[:-1], raise_for_status=raise_for_status,
+                               stream=stream)
 
     def code(self, pretty: bool = False) -> str:
         """Convert request to Python code using to_python_code()."""
         return to_python_code(*self[:-1], pretty=pretty)
 
 
+FrozenRequestData = Tuple[str, str, Tuple[Tuple[str, str], ...], Optional[bytes], Tuple[str, ...]]
+
+
+def _request_data(frozen: FrozenRequestData,
+                  on_ignored: Optional[Callable[[str], None]]) -> RequestData:
+    method, url, headers, data, ignored = frozen
+    if on_ignored is not None:
+        for arg in ignored:
+            on_ignored(arg)
+        ignored = ()
+    return RequestData(method, url, dict(headers), data, list(ignored))
+
+
+class _CurlOpts:
+    """Options collected by curl_to_requests()."""
+
+    __slots__ = ("method", "header_pairs", "data", "ignored")
+
+    def __init__(self) -> None:
+        self.method: Optional[str] = None
+        self.header_pairs: List[Tuple[str, str]] = []
+        self.data: Optional[bytes] = None
+        self.ignored: List[str] = []
+
+
+def _curl_header(opts: _CurlOpts, arg: str) -> None:
+    k, sep, v = arg.partition(": ")
+    if not sep:
+        raise ValueError(f"Invalid curl header: {arg}")
+    opts.header_pairs.append((k, v))
+
+
+def _curl_method(opts: _CurlOpts, arg: str) -> None:
+    assert arg in METHODS
+    opts.method = arg
+
+
+def _curl_data_raw(opts: _CurlOpts, arg: str) -> None:
+    opts.data = arg.encode()
+
+
+# option -> handler for its argument (None: ignored option w/o argument)
+CURL_OPTS: Dict[str, Optional[Callable[[_CurlOpts, str], None]]] = {
+    "-H": _curl_header, "-X": _curl_method, "--data-raw": _curl_data_raw,
+    "--compressed": None,
+}
+
+
 # FIXME: use argparse?!
-def curl_to_requests(command: str) -> RequestData:
+def curl_to_requests(command: str, *,
+                     on_ignored: Optional[Callable[[str], None]] = None) -> RequestData:
     r"""
     Parse curl command from "copy as cURL" (Firefox, Chromium).
 
     Returns RequestData.
 
+    If on_ignored is given, it is called for each ignored option instead of
+    collecting them in RequestData.ignored.
+
     Examples
     --------
 
@@ -133,6 +210,9 @@ def curl_to_requests(command: str) -> RequestData:
     ... '''
     >>> curl_to_requests(command)
     RequestData(method='GET', url='https://example.com', headers={'User-Agent': 'Mozilla/5.0'}, data=None, ignored=['--compressed'])
+    >>> curl_to_requests(command, on_ignored=print)
+    --compressed
+    RequestData(method='GET', url='https://example.com', headers={'User-Agent': 'Mozilla/5.0'}, data=None, ignored=[])
     >>> command = r'''
     ... curl 'https://example.com' -H 'User-Agent: Mozilla/5.0'
     ... -H 'Accept: application/json' -X POST --data-raw foo
@@ -140,31 +220,42 @@ def curl_to_requests(command: str) -> RequestData:
     >>> curl_to_requests(command)
     RequestData(method='POST', url='https://example.com', headers={'User-Agent': 'Mozilla/5.0', 'Accept': 'application/json'}, data=b'foo', ignored=[])
 
+    Parse results are cached; each call returns fresh headers & ignored.
+
+    >>> curl_to_requests(command).headers.clear()
+    >>> curl_to_requests(command).headers
+    {'User-Agent': 'Mozilla/5.0', 'Accept': 'application/json'}
+
     """
-    method, headers, data, ignored = None, {}, None, []
-    cmd, url, *curl = split_curl_command(command)
+    return _request_data(_curl_to_requests(command), on_ignored)
+
+
+# cached, so returns immutable data: headers as (name, value) pairs (later
+# duplicates win when curl_to_requests() turns them into a fresh dict)
+@functools.lru_cache(maxsize=256)
+def _curl_to_requests(command: str) -> FrozenRequestData:
+    opts = _CurlOpts()
+    tokens = _iter_curl_command(command)
+    cmd, url = next(tokens, None), next(tokens, None)
     assert cmd == "curl"
-    i, n = 0, len(curl)
-    while i < n:
-        if curl[i] == "-H":
-            k, v = curl[i + 1].split(": ", 1)
-            headers[k] = v
-            i += 1
-        elif curl[i] == "-X":
-            method = curl[i + 1]
-            assert method in METHODS
-            i += 1
-        elif curl[i] == "--data-raw":
-            data = curl[i + 1].encode()
-            i += 1
-        elif curl[i] == "--compressed":
-            ignored.append(curl[i])
-        else:
-            raise NotImplementedError(f"Unknown curl argument: {curl[i]}")
-        i += 1
+    if url is None:
+        raise ValueError("Missing curl URL")
+    for opt in tokens:
+        try:
+            handler = CURL_OPTS[opt]
+        except KeyError:
+            raise NotImplementedError(f"Unknown curl argument: {opt}") from None
+        if handler is None:
+            opts.ignored.append(opt)
+            continue
+        arg = next(tokens, None)
+        if arg is None:
+            raise ValueError(f"Missing argument for curl option: {opt}")
+        handler(opts, arg)
+    method = opts.method
     if method is None:
-        method = "POST" if data else "GET"
-    return RequestData(method, url, headers, data, ignored)
+        method = "POST" if opts.data else "GET"
+    return method, url, tuple(opts.header_pairs), opts.data, tuple(opts.ignored)
 
 
 def split_curl_command(command: str) -> Tuple[str, ...]:
@@ -210,50 +301,53 @@ def split_curl_command(command: str) -> Tuple[str, ...]:
     Could not parse $'' string
 
     """
-    tokens = []
+    return tuple(_iter_curl_command(command))
+
+
+def _iter_curl_command(command: str) -> Iterator[str]:
+    """Lazily split curl command; see split_curl_command()."""
     s = command.strip()
+    # fast path: the typical "copy as cURL" output only has single-quoted and
+    # plain tokens (no $'' strings, comments, quotes or backslashes except for
+    # line continuations) and can be split w/ regexes; fall back to the full
+    # scanner below (which also produces the errors) for anything else
+    if SIMPLE_CURL.fullmatch(s):
+        for tok in SIMPLE_TOKEN.finditer(s):
+            yield tok[1] if tok[1] is not None else tok[2]
+        return
     i, n = 0, len(s)
 
-    def read_token(f: Callable[[str], bool]) -> str:
-        nonlocal i
-        token = ""
-        while i < n and not f(s[i]):
-            token += s[i]
-            i += 1
-        return token
-
     while i < n:
-        if s[i:i + 2] == "\\\n":
+        if s.startswith("\\\n", i):
             i += 2
         elif s[i] == "#":
             break
         elif s[i] == "'":
-            i += 1
-            t = read_token(lambda c: c == "'")
-            if not (i < n and s[i] == "'"):
+            j = s.find("'", i + 1)
+            if j < 0:
                 raise ValueError("Unterminated single-quoted string")
-            i += 1
+            t, i = s[i + 1:j], j + 1
             if i < n and not s[i].isspace():
                 raise ValueError("Expected whitespace after single-quoted string")
-            tokens.append(t)
-        elif s[i:i + 2] == "$'":
-            t, s = parse_dollar_string(s[i:])
-            i, n = 0, len(s)
+            yield t
+        elif s.startswith("$'", i):
+            t, i = _parse_dollar_string(s, i)
             if i < n and not s[i].isspace():
                 raise ValueError("Expected whitespace after $'' string")
-            tokens.append(t)
+            yield t
         else:
-            t = read_token(str.isspace)
+            m = BARE_TOKEN.match(s, i)
+            assert m is not None
+            t, i = m.group(), m.end()
             if "'" in t:
                 raise ValueError("Expected whitespace before single-quoted string")
             if '"' in t:
                 raise ValueError("Unsupported double-quoted string")
             if "\\" in t:
                 raise ValueError("Unsupported backslash escape")
-            tokens.append(t)
-        s = s[i:].lstrip()
-        i, n = 0, len(s)
-    return tuple(tokens)
+            yield t
+        while i < n and s[i].isspace():
+            i += 1
 
 
 def parse_dollar_string(s: str) -> Tuple[str, str]:
@@ -282,57 +376,72 @@ def parse_dollar_string(s: str) -> Tuple[str, str]:
     True
 
     """
-    t, i, n = "", 2, len(s)
+    t, i = _parse_dollar_string(s, 0)
+    return t, s[i:]
+
+
+def _parse_dollar_string(s: str, i: int) -> Tuple[str, int]:
+    """Parse $'' string starting at s[i]; returns parsed_string, end_index."""
+    parts: List[str] = []
+    i, n = i + 2, len(s)
     try:
         while i < n:
             c = s[i]
             i += 1
             if c == "'":
-                return t, s[i:]
+                return "".join(parts), i
             elif c == "\\":
                 d = s[i]
                 i += 1
-                if d in ESC:
-                    t += ESC[d]
+                e = ESC.get(d)
+                if e is not None:
+                    parts.append(e)
                 elif d in OCT:
-                    o = d
+                    v = ord(d) - 48
                     for _ in range(2):
                         if not s[i] in OCT:
                             break
-                        o += s[i]
+                        v = v * 8 + ord(s[i]) - 48
                         i += 1
-                    t += chr(int(o, 8))
-                elif d in "xuU":
-                    if not s[i].lower() in HEX:
-                        break
-                    h = s[i]
-                    i += 1
-                    for _ in range(2 ** (1 + "xuU".index(d)) - 1):
-                        if not s[i].lower() in HEX:
+                    parts.append(chr(v))
+                elif d in HEX_DIGITS:
+                    v, j = 0, i
+                    for _ in range(HEX_DIGITS[d]):
+                        h = HEX.get(s[i])
+                        if h is None:
                             break
-                        h += s[i]
+                        v = v << 4 | h
                         i += 1
-                    t += chr(int(h, 16))
+                    if i == j:
+                        break
+                    parts.append(chr(v))
                 elif d == "c":
                     x = s[i]
                     i += 1
-                    t += chr(ord(x) - 64)
+                    parts.append(chr(ord(x) - 64))
                 else:
                     break
             else:
-                t += c
+                m = DOLLAR_SPECIAL.search(s, i)
+                j = m.start() if m else n
+                parts.append(s[i - 1:j])
+                i = j
     except IndexError:
         pass
     raise ValueError("Could not parse $'' string")
 
 
-def fetch_to_requests(command: str) -> RequestData:
+def fetch_to_requests(command: str, *,
+                      on_ignored: Optional[Callable[[str], None]] = None) -> RequestData:
     r"""
     Parse fetch code from "copy as fetch" (Firefox, Chromium) or "copy as
     Node.js fetch" (Chromium).
 
     Returns RequestData.
 
+    If on_ignored is given, it is called for each ignored option instead of
+    collecting them in RequestData.ignored.
+
     CAVEATS
     -------
 
@@ -373,9 +482,15 @@ def fetch_to_requests(command: str) -> RequestData:
     RequestData(method='POST', url='https://example.com', headers={'User-Agent': 'Mozilla/5.0', 'Accept': 'application/json'}, data=b'foo', ignored=['credentials=', 'mode='])
 
     """
-    command = re.sub(r"^(await )?fetch\(", "[", command)
-    command = re.sub(r"\);$", "]", command)
-    url, args = json.loads(command)
+    return _request_data(_fetch_to_requests(command), on_ignored)
+
+
+# cached, so returns immutable data (like _curl_to_requests())
+@functools.lru_cache(maxsize=256)
+def _fetch_to_requests(command: str) -> FrozenRequestData:
+    command = FETCH_HEAD.sub("[", command, count=1)
+    command = FETCH_TAIL.sub("]", command, count=1)
+    url, args = json_loads(command)
     method = args.pop("method", "GET")
     headers = args.pop("headers", {})
     data = args.pop("body", None)
@@ -386,7 +501,7 @@ def fetch_to_requests(command: str) -> RequestData:
     if referrer_policy := args.pop("referrerPolicy", None):
         headers["referrer-policy"] = referrer_policy
     assert method in METHODS
-    return RequestData(method, url, headers, data, [f"{k}=" for k in args])
+    return method, url, tuple(headers.items()), data, tuple(f"{k}=" for k in args)
 
 
 def curl_to_python_code(command: str, pretty: bool = False) -> str:
@@ -433,6 +548,11 @@ def curl_to_python_code(command: str, pretty: bool = False) -> str:
     requests.request('POST', 'https://example.com', headers={}, data=(
         b'datadatadatadatadatadatadatadata'
     ))
+    >>> command = "curl 'https://example.com' -H 'X-Token: " + "0123456789" * 8 + "'"
+    >>> print(curl_to_python_code(command, pretty=True))
+    requests.request('GET', 'https://example.com', headers={
+        'X-Token': '01234567890123456789012345678901234567890123456789012345678901234567890123456789',
+    })
 
     """
     return to_python_code(*curl_to_requests(command)[:-1], pretty=pretty)
@@ -446,32 +566,103 @@ def fetch_to_python_code(command: str, pretty: bool = False) -> str:
 def to_python_code(method: str, url: str, headers: Dict[str, str],
                    data: Optional[bytes] = None, pretty: bool = False) -> str:
     """Create Python code for requests.request() call."""
-    if pretty and headers:
-        h = pprint.pformat(headers, indent=4, sort_dicts=False)
-        a = "\n " if "\n" in h else "\n    "
-        b = ",\n" if "\n" in h else "\n"
-        h = h[0] + a + h[1:-1] + b + h[-1]
-    else:
-        h = repr(headers)
+    if not pretty:
+        d = f", data={data!r}" if data is not None else ""
+        return f"requests.request({method!r}, {url!r}, headers={headers!r}{d})"
+    h = _pformat_headers(headers) if headers else repr(headers)
     s = f"requests.request({method!r}, {url!r}, headers={h}"
     t = f", data={data!r})" if data is not None else ")"
-    if pretty and data is not None:
+    if data is not None:
         if len(s.rsplit("\n", 1)[-1]) + len(t) > 80:
-            t = pprint.pformat(data).replace("\n", "\n   ")
-            t = ", data=(\n    " + (t[1:-1] if "\n" in t else t) + "\n))"
+            t = ", data=(\n    " + _pformat_bytes(data) + "\n))"
     return s + t
 
 
+# NB: these produce the same layout as pprint.pformat() (width=80) for the flat
+# dict of str headers and the bytes body that to_python_code() needs, without
+# going through the generic pprint machinery.
+
+def _pformat_headers(headers: Dict[str, str]) -> str:
+    h = repr(headers)
+    if len(h) <= 80:
+        return "{\n    " + h[1:-1] + "\n}"
+    items = []
+    for k, v in headers.items():
+        kr, vr = repr(k), repr(v)
+        indent = 4 + len(kr) + 2
+        if isinstance(v, str) and len(vr) > 80 - indent - 1:
+            vr = ("\n" + " " * indent).join(_wrap_str(v, 80 - indent, 1))
+        items.append(f"{kr}: {vr}")
+    return "{\n    " + ",\n    ".join(items) + ",\n}"
+
+
+def _pformat_bytes(data: bytes) -> str:
+    if len(repr(data)) <= 80:
+        return repr(data)
+    return "\n    ".join(_wrap_bytes(data, 79, 1))
+
+
+def _wrap_str(s: str, width: int, allowance: int) -> List[str]:
+    if not s:
+        return [repr(s)]
+    chunks = []
+    lines = s.splitlines(True)
+    for i, line in enumerate(lines):
+        last_line = i == len(lines) - 1
+        if len(repr(line)) <= width - (allowance if last_line else 0):
+            chunks.append(repr(line))
+            continue
+        parts = STR_PARTS.findall(line)[:-1]
+        current = ""
+        for j, part in enumerate(parts):
+            w = width - (allowance if last_line and j == len(parts) - 1 else 0)
+            if len(repr(current + part)) > w:
+                if current:
+                    chunks.append(repr(current))
+                current = part
+            else:
+                current += part
+        if current:
+            chunks.append(repr(current))
+    return chunks
+
+
+def _wrap_bytes(data: bytes, width: int, allowance: int) -> List[str]:
+    chunks, current = [], b""
+    last = len(data) // 4 * 4
+    for i in range(0, len(data), 4):
+        part = data[i:i + 4]
+        if i == last:
+            width -= allowance
+        if len(repr(current + part)) > width:
+            if current:
+                chunks.append(repr(current))
+            current = part
+        else:
+            current += part
+    if current:
+        chunks.append(repr(current))
+    return chunks
+
+
 def perform_request(method: str, url: str, headers: Dict[str, str],
                     data: Optional[bytes] = None,
-                    raise_for_status: bool = True) -> requests.Response:
-    r = requests.request(method, url, headers=headers, data=data)   # pylint: disable=W3101
+                    raise_for_status: bool = True, *,
+                    stream: bool = False) -> "requests.Response":
+    import requests     # pylint: disable=C0415
+    r = requests.request(method, url, headers=headers, data=data,  # pylint: disable=W3101
+                         stream=stream)
     if raise_for_status:
-        r.raise_for_status()
+        try:
+            r.raise_for_status()
+        except Exception:
+            r.close()   # release the (streamed) connection
+            raise
     return r
 
 
-def main() -> None:
+@functools.lru_cache(maxsize=None)
+def _argument_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog=NAME, description=DESC)
     parser.add_argument("--fetch", action="store_true",
                         help="parse fetch instead of curl; NB: see CAVEATS")
@@ -483,17 +674,31 @@ def main() -> None:
     sub_exec.add_argument("-v", "--verbose", action="store_true")
     sub_code = subs.add_parser("code", help="print the Python code")
     sub_code.add_argument("--pretty", action="store_true", help="pretty-print")
-    args = parser.parse_args()
-    command = sys.stdin.read()
-    req = fetch_to_requests(command) if args.fetch else curl_to_requests(command)
-    for arg in req.ignored:
-        print(f"Warning: ignoring {arg}", file=sys.stderr)
+    return parser
+
+
+def _warn_ignored(arg: str) -> None:
+    print(f"Warning: ignoring {arg}", file=sys.stderr)
+
+
+def main() -> None:
+    args = _argument_parser().parse_args()
+    command = sys.stdin.buffer.read().decode()
+    if "\r" in command:    # universal newlines, like sys.stdin.read()
+        command = command.replace("\r\n", "\n").replace("\r", "\n")
+    parse = fetch_to_requests if args.fetch else curl_to_requests
+    req = parse(command, on_ignored=_warn_ignored)
     if args.command == "code":
-        print(req.code(pretty=args.pretty))
+        sys.stdout.write(req.code(pretty=args.pretty) + "\n")
     elif args.command == "exec":
         if args.verbose:
-            print(f"{req.method} {req.url} headers={req.headers} data={req.data}", file=sys.stderr)
-        print(req.exec().text, end="")
+            data = req.data
+            d = f"<{len(data)} bytes>" if data is not None and len(data) > 512 else repr(data)
+            print(f"{req.method} {req.url} headers={req.headers} data={d}", file=sys.stderr)
+        with req.exec(stream=True) as r:
+            for chunk in r.iter_content(chunk_size=65536):
+                sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
 
 
 if __name__ == "__main__":
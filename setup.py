@@ -1,10 +1,18 @@
 from pathlib import Path
+import os
 import setuptools
 
 __version__ = "0.2.0"
 
 info = Path(__file__).with_name("README.md").read_text(encoding = "utf8")
 
+# optional: compile w/ mypyc (CONVERT_TO_REQUESTS_MYPYC=1); pure Python otherwise
+if os.environ.get("CONVERT_TO_REQUESTS_MYPYC") == "1":
+    from mypyc.build import mypycify
+    ext_modules = mypycify(["convert_to_requests/__init__.py"])
+else:
+    ext_modules = []
+
 setuptools.setup(
     name              = "convert-to-requests",
     url               = "https://github.com/obfusk/convert-to-requests",
@@ -42,6 +50,8 @@ setuptools.setup(
     entry_points      = dict(console_scripts = ["convert-to-requests = convert_to_requests:main"]),
     packages          = ["convert_to_requests"],
     package_data      = dict(convert_to_requests = ["py.typed"]),
+    ext_modules       = ext_modules,
     python_requires   = ">=3.8",
     install_requires  = ["requests"],
+    extras_require    = dict(fast = ["orjson; platform_python_implementation == 'CPython'"]),
 )